@@ -1,48 +1,140 @@
 import asyncio
 import logging
-import shutil
+import os
+import time
 from datetime import datetime, timedelta
-from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Directory stats cache: path -> (expiry, total_size, file_count)
+_SIZE_CACHE_TTL = 60.0
+_size_cache: Dict[str, Tuple[float, int, int]] = {}
+
+
+def _scan_dir_stats(path: str) -> Tuple[int, int]:
+    """Return (total_size, file_count) for a directory tree in a single pass"""
+    total_size = 0
+    file_count = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total_size += entry.stat(follow_symlinks=False).st_size
+                        file_count += 1
+        except OSError as e:
+            logger.error(f"Error scanning directory {current}: {e}")
+    return total_size, file_count
+
+
+def _fast_rmtree(path: str) -> List[OSError]:
+    """Remove a directory tree bottom-up, collecting errors instead of raising"""
+    # Like shutil.rmtree, never follow a symlinked root out of the tree
+    if os.path.islink(path):
+        return [OSError(f"Cannot remove symbolic link {path} as a directory tree")]
+        
+    errors = []
+    stack = [(path, False)]
+    while stack:
+        current, emptied = stack.pop()
+        if emptied:
+            # All children have been handled, remove the directory itself
+            try:
+                os.rmdir(current)
+            except OSError as e:
+                errors.append(e)
+            continue
+            
+        stack.append((current, True))
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, False))
+                    else:
+                        try:
+                            os.unlink(entry.path)
+                        except OSError as e:
+                            errors.append(e)
+        except OSError as e:
+            errors.append(e)
+    return errors
+
+
+def _cached_dir_stats(path: str) -> Tuple[int, int]:
+    """Return (total_size, file_count) for a directory, reusing recent scans"""
+    now = time.monotonic()
+    cached = _size_cache.get(path)
+    if cached and now < cached[0]:
+        return cached[1], cached[2]
+        
+    total_size, file_count = _scan_dir_stats(path)
+    _size_cache[path] = (now + _SIZE_CACHE_TTL, total_size, file_count)
+    return total_size, file_count
+
+
+def invalidate_size_cache(path: str):
+    """Drop cached stats for a directory that is about to change"""
+    _size_cache.pop(path, None)
+
+
+def _list_dirs(path: str) -> List[os.DirEntry]:
+    """Materialize the subdirectory entries of a directory"""
+    with os.scandir(path) as entries:
+        return [entry for entry in entries if entry.is_dir(follow_symlinks=False)]
+
+
+def _find_recordings_dirs(base_path: str) -> List[Tuple[str, str]]:
+    """Return (camera_id, recordings_dir) for every camera directory that has recordings"""
+    # Walk the disk rather than the config so disabled or removed cameras still age out
+    if not os.path.isdir(base_path):
+        return []
+    return [
+        (camera_dir.name, recordings_dir)
+        for camera_dir in _list_dirs(base_path)
+        if os.path.isdir(recordings_dir := os.path.join(camera_dir.path, "recordings"))
+    ]
+
+
+async def _bounded(semaphore: asyncio.BoundedSemaphore, coro):
+    """Await a coroutine while holding a semaphore slot"""
+    async with semaphore:
+        return await coro
+
 
 class CleanupManager:
     def __init__(self):
-        self.is_running = False
-        self.cleanup_task = None
+        self.cleanup_task: Optional[asyncio.Task] = None
         
     async def start_cleanup_scheduler(self):
         """Start the automatic cleanup scheduler"""
-        if self.is_running:
+        if self.cleanup_task and not self.cleanup_task.done():
             return
             
-        self.is_running = True
         self.cleanup_task = asyncio.create_task(self._cleanup_loop())
         logger.info("Cleanup scheduler started")
         
     async def stop_cleanup_scheduler(self):
         """Stop the automatic cleanup scheduler"""
-        self.is_running = False
         if self.cleanup_task:
             self.cleanup_task.cancel()
-            try:
-                await self.cleanup_task
-            except asyncio.CancelledError:
-                pass
+            await asyncio.gather(self.cleanup_task, return_exceptions=True)
+            self.cleanup_task = None
         logger.info("Cleanup scheduler stopped")
         
     async def _cleanup_loop(self):
-        """Main cleanup loop that runs periodically"""
-        while self.is_running:
+        """Main cleanup loop that runs periodically until cancelled"""
+        while True:
             try:
                 await self.cleanup_old_recordings()
                 # Run cleanup every hour
                 await asyncio.sleep(3600)
-            except asyncio.CancelledError:
-                break
             except Exception as e:
                 logger.error(f"Error in cleanup loop: {e}")
                 await asyncio.sleep(300)  # Wait 5 minutes before retrying
@@ -57,26 +149,21 @@ class CleanupManager:
         }
         
         try:
-            hls_path = Path(settings.hls_base_path)
-            if not hls_path.exists():
+            recordings_dirs = await asyncio.to_thread(_find_recordings_dirs, settings.hls_base_path)
+            if not recordings_dirs:
                 return cleanup_stats
                 
             cutoff_date = datetime.now() - timedelta(days=settings.retention_days)
             logger.info(f"Starting cleanup of recordings older than {cutoff_date.strftime('%Y-%m-%d')}")
             
-            # Process each camera directory
-            for camera_dir in hls_path.iterdir():
-                if not camera_dir.is_dir():
-                    continue
-                    
-                recordings_dir = camera_dir / "recordings"
-                if not recordings_dir.exists():
-                    continue
-                
-                camera_stats = await self._cleanup_camera_recordings(
-                    recordings_dir, cutoff_date
-                )
+            # Clean up cameras concurrently, capping parallel filesystem work
+            semaphore = asyncio.BoundedSemaphore(min(8, len(recordings_dirs)))
+            results = await asyncio.gather(*[
+                _bounded(semaphore, self._cleanup_camera_recordings(recordings_dir, cutoff_date))
+                for _, recordings_dir in recordings_dirs
+            ])
                 
+            for camera_stats in results:
                 cleanup_stats["deleted_files"] += camera_stats["deleted_files"]
                 cleanup_stats["deleted_folders"] += camera_stats["deleted_folders"]
                 cleanup_stats["freed_space"] += camera_stats["freed_space"]
@@ -95,7 +182,7 @@ class CleanupManager:
             
         return cleanup_stats
         
-    async def _cleanup_camera_recordings(self, recordings_dir: Path, cutoff_date: datetime) -> dict:
+    async def _cleanup_camera_recordings(self, recordings_dir: str, cutoff_date: datetime) -> dict:
         """Clean up recordings for a specific camera"""
         stats = {
             "deleted_files": 0,
@@ -104,37 +191,38 @@ class CleanupManager:
             "errors": []
         }
         
+        # YYYY-MM-DD names sort chronologically, so compare them as strings
+        cutoff_str = cutoff_date.strftime("%Y-%m-%d")
+        
         try:
             # Process each date directory
-            for date_dir in recordings_dir.iterdir():
-                if not date_dir.is_dir():
+            for date_dir in await asyncio.to_thread(_list_dirs, recordings_dir):
+                name = date_dir.name
+                if len(name) != 10 or name[4] != "-" or name[7] != "-":
+                    # Invalid date format, skip
+                    logger.warning(f"Skipping directory with invalid date format: {date_dir.path}")
+                    continue
+                if name >= cutoff_str:
                     continue
                     
                 try:
-                    # Parse date from directory name (YYYY-MM-DD)
-                    dir_date = datetime.strptime(date_dir.name, "%Y-%m-%d")
+                    # Calculate size and file count before deletion
+                    dir_size, file_count = await asyncio.to_thread(_cached_dir_stats, date_dir.path)
+                    
+                    # Delete the entire date directory
+                    invalidate_size_cache(date_dir.path)
+                    errors = await asyncio.to_thread(_fast_rmtree, date_dir.path)
+                    if errors:
+                        raise OSError(f"{len(errors)} error(s), first: {errors[0]}")
+                    
+                    stats["deleted_folders"] += 1
+                    stats["deleted_files"] += file_count
+                    stats["freed_space"] += dir_size
+                    
+                    logger.debug(f"Deleted directory: {date_dir.path}")
                     
-                    if dir_date < cutoff_date:
-                        # Calculate size before deletion
-                        dir_size = await self._get_directory_size(date_dir)
-                        
-                        # Delete the entire date directory
-                        shutil.rmtree(date_dir)
-                        
-                        stats["deleted_folders"] += 1
-                        stats["freed_space"] += dir_size
-                        
-                        # Count files that were deleted
-                        stats["deleted_files"] += await self._count_files_in_directory(date_dir)
-                        
-                        logger.debug(f"Deleted directory: {date_dir}")
-                        
-                except ValueError:
-                    # Invalid date format, skip
-                    logger.warning(f"Skipping directory with invalid date format: {date_dir}")
-                    continue
                 except Exception as e:
-                    error_msg = f"Error deleting directory {date_dir}: {e}"
+                    error_msg = f"Error deleting directory {date_dir.path}: {e}"
                     logger.error(error_msg)
                     stats["errors"].append(error_msg)
                     
@@ -145,28 +233,6 @@ class CleanupManager:
             
         return stats
         
-    async def _get_directory_size(self, directory: Path) -> int:
-        """Calculate total size of a directory"""
-        total_size = 0
-        try:
-            for file_path in directory.rglob("*"):
-                if file_path.is_file():
-                    total_size += file_path.stat().st_size
-        except Exception as e:
-            logger.error(f"Error calculating directory size for {directory}: {e}")
-        return total_size
-        
-    async def _count_files_in_directory(self, directory: Path) -> int:
-        """Count total number of files in a directory"""
-        count = 0
-        try:
-            for file_path in directory.rglob("*"):
-                if file_path.is_file():
-                    count += 1
-        except Exception as e:
-            logger.error(f"Error counting files in directory {directory}: {e}")
-        return count
-        
     async def get_cleanup_preview(self) -> dict:
         """Preview what would be cleaned up without actually deleting"""
         preview = {
@@ -178,32 +244,25 @@ class CleanupManager:
         }
         
         try:
-            hls_path = Path(settings.hls_base_path)
-            if not hls_path.exists():
-                return preview
-                
             cutoff_date = datetime.now() - timedelta(days=settings.retention_days)
             preview["cutoff_date"] = cutoff_date.strftime("%Y-%m-%d")
             
-            # Process each camera directory
-            for camera_dir in hls_path.iterdir():
-                if not camera_dir.is_dir():
-                    continue
-                    
-                recordings_dir = camera_dir / "recordings"
-                if not recordings_dir.exists():
-                    continue
-                
-                camera_preview = await self._preview_camera_cleanup(
-                    recordings_dir, cutoff_date
-                )
+            camera_dirs = await asyncio.to_thread(_find_recordings_dirs, settings.hls_base_path)
+            
+            # Preview cameras concurrently, capping parallel filesystem work
+            semaphore = asyncio.BoundedSemaphore(min(8, len(camera_dirs)))
+            results = await asyncio.gather(*[
+                _bounded(semaphore, self._preview_camera_cleanup(recordings_dir, cutoff_date))
+                for _, recordings_dir in camera_dirs
+            ])
                 
+            for (camera_id, _), camera_preview in zip(camera_dirs, results):
                 if camera_preview["folders_to_delete"] > 0:
                     preview["files_to_delete"] += camera_preview["files_to_delete"]
                     preview["folders_to_delete"] += camera_preview["folders_to_delete"]
                     preview["space_to_free"] += camera_preview["space_to_free"]
                     preview["affected_cameras"].append({
-                        "camera_id": camera_dir.name,
+                        "camera_id": camera_id,
                         "folders_to_delete": camera_preview["folders_to_delete"],
                         "files_to_delete": camera_preview["files_to_delete"],
                         "space_to_free": camera_preview["space_to_free"]
@@ -214,7 +273,7 @@ class CleanupManager:
             
         return preview
         
-    async def _preview_camera_cleanup(self, recordings_dir: Path, cutoff_date: datetime) -> dict:
+    async def _preview_camera_cleanup(self, recordings_dir: str, cutoff_date: datetime) -> dict:
         """Preview cleanup for a specific camera"""
         preview = {
             "files_to_delete": 0,
@@ -222,30 +281,29 @@ class CleanupManager:
             "space_to_free": 0
         }
         
+        # YYYY-MM-DD names sort chronologically, so compare them as strings
+        cutoff_str = cutoff_date.strftime("%Y-%m-%d")
+        
         try:
             # Process each date directory
-            for date_dir in recordings_dir.iterdir():
-                if not date_dir.is_dir():
+            for date_dir in await asyncio.to_thread(_list_dirs, recordings_dir):
+                name = date_dir.name
+                if len(name) != 10 or name[4] != "-" or name[7] != "-":
+                    # Invalid date format, skip
+                    continue
+                if name >= cutoff_str:
                     continue
                     
                 try:
-                    # Parse date from directory name (YYYY-MM-DD)
-                    dir_date = datetime.strptime(date_dir.name, "%Y-%m-%d")
+                    # Calculate size and file count
+                    dir_size, file_count = await asyncio.to_thread(_cached_dir_stats, date_dir.path)
+                    
+                    preview["folders_to_delete"] += 1
+                    preview["files_to_delete"] += file_count
+                    preview["space_to_free"] += dir_size
                     
-                    if dir_date < cutoff_date:
-                        # Calculate size and file count
-                        dir_size = await self._get_directory_size(date_dir)
-                        file_count = await self._count_files_in_directory(date_dir)
-                        
-                        preview["folders_to_delete"] += 1
-                        preview["files_to_delete"] += file_count
-                        preview["space_to_free"] += dir_size
-                        
-                except ValueError:
-                    # Invalid date format, skip
-                    continue
                 except Exception as e:
-                    logger.error(f"Error previewing directory {date_dir}: {e}")
+                    logger.error(f"Error previewing directory {date_dir.path}: {e}")
                     
         except Exception as e:
             logger.error(f"Error previewing camera recordings {recordings_dir}: {e}")
@@ -262,11 +320,9 @@ class CleanupManager:
         }
         
         try:
-            hls_path = Path(settings.hls_base_path)
-            camera_dir = hls_path / camera_id
-            recordings_dir = camera_dir / "recordings"
+            recordings_dir = os.path.join(settings.hls_base_path, camera_id, "recordings")
             
-            if not recordings_dir.exists():
+            if not await asyncio.to_thread(os.path.isdir, recordings_dir):
                 cleanup_stats["errors"].append(f"Recordings directory not found for camera {camera_id}")
                 return cleanup_stats
                 
@@ -1,35 +1,40 @@
 import os
+from functools import lru_cache
 from typing import Dict, List, Optional
-from pydantic import Field
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+        frozen=True
+    )
+    
     # Server Configuration
-    server_host: str = Field(default="0.0.0.0", env="SERVER_HOST")
-    server_port: int = Field(default=8000, env="SERVER_PORT")
-    api_version: str = Field(default="v1", env="API_VERSION")
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    api_version: str = "v1"
     
     # Storage Configuration
-    hls_base_path: str = Field(default="./hls", env="HLS_BASE_PATH")
-    retention_days: int = Field(default=30, env="RETENTION_DAYS")
+    hls_base_path: str = "./hls"
+    retention_days: int = 30
     
     # FFmpeg Configuration
-    ffmpeg_thread_count: int = Field(default=2, env="FFMPEG_THREAD_COUNT")
-    hls_segment_duration: int = Field(default=10, env="HLS_SEGMENT_DURATION")
-    hls_list_size: int = Field(default=6, env="HLS_LIST_SIZE")
-    video_bitrate: str = Field(default="2000k", env="VIDEO_BITRATE")
-    audio_bitrate: str = Field(default="128k", env="AUDIO_BITRATE")
+    ffmpeg_thread_count: int = 2
+    hls_segment_duration: int = 10
+    hls_list_size: int = 6
+    video_bitrate: str = "2000k"
+    audio_bitrate: str = "128k"
+    video_encoder: str = "auto"
     
     # Health Monitoring
-    health_check_interval: int = Field(default=30, env="HEALTH_CHECK_INTERVAL")
-    cpu_threshold: int = Field(default=80, env="CPU_THRESHOLD")
-    memory_threshold: int = Field(default=80, env="MEMORY_THRESHOLD")
-    disk_threshold: int = Field(default=90, env="DISK_THRESHOLD")
-
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    health_check_interval: int = 30
+    cpu_threshold: int = 80
+    memory_threshold: int = 80
+    disk_threshold: int = 90
+    metrics_ttl: float = 2.0
 
 
 class CameraConfig:
@@ -44,16 +49,24 @@ def load_camera_configs() -> Dict[str, CameraConfig]:
     """Load camera configurations from environment variables"""
     cameras = {}
     
-    # Look for camera configurations in environment variables
-    i = 1
-    while True:
-        camera_id = os.getenv(f"CAMERA_{i}_ID")
+    # Find every configured camera index in a single pass over the environment
+    indices = sorted(
+        {
+            key.split("_")[1]
+            for key in os.environ
+            if key.startswith("CAMERA_") and key.endswith("_ID") and key.split("_")[1].isdigit()
+        },
+        key=int
+    )
+    
+    for i in indices:
+        camera_id = os.environ.get(f"CAMERA_{i}_ID")
         if not camera_id:
-            break
+            continue
             
-        camera_name = os.getenv(f"CAMERA_{i}_NAME", f"Camera {i}")
-        rtsp_url = os.getenv(f"CAMERA_{i}_RTSP_URL")
-        enabled = os.getenv(f"CAMERA_{i}_ENABLED", "true").lower() == "true"
+        camera_name = os.environ.get(f"CAMERA_{i}_NAME", f"Camera {i}")
+        rtsp_url = os.environ.get(f"CAMERA_{i}_RTSP_URL")
+        enabled = os.environ.get(f"CAMERA_{i}_ENABLED", "true").lower() == "true"
         
         if rtsp_url and enabled:
             cameras[camera_id] = CameraConfig(
@@ -62,12 +75,16 @@ def load_camera_configs() -> Dict[str, CameraConfig]:
                 rtsp_url=rtsp_url,
                 enabled=enabled
             )
-        
-        i += 1
     
     return cameras
 
 
+@lru_cache
+def get_settings() -> Settings:
+    """Return the process-wide settings instance"""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
 camera_configs = load_camera_configs() 
\ No newline at end of file
@@ -1,23 +1,176 @@
 import asyncio
-import subprocess
+import functools
+import json
 import os
 import signal
+import subprocess
 import logging
-from typing import Dict, Optional, List
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, List, Set, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
-from config import settings, CameraConfig
+from config import settings, camera_configs, CameraConfig
+from models import CameraInfo
 
 logger = logging.getLogger(__name__)
 
+# Auto-restart backoff and rate limits
+RESTART_BACKOFF_INITIAL = 2.0
+RESTART_BACKOFF_MAX = 300.0
+RESTART_HEALTHY_PERIOD = 600.0
+RESTART_WINDOW = 3600.0
+MAX_RESTARTS_PER_WINDOW = 20
+
+# Length of each recording segment, in seconds
+RECORDING_SEGMENT_TIME = 60
+
+# Per-hour recording manifest, written once the hour's last segment is closed.
+# The segment muxer only splits on a keyframe, so the hour is final once the
+# next hour's first segment exists (or FFmpeg stopped or gave up on the split).
+RECORDING_INDEX_FILE = "index.json"
+HOUR_FINALIZE_POLL = 5.0
+HOUR_FINALIZE_TIMEOUT = 300.0
+
+# Limit on FFmpeg processes starting at the same time, and the pause between starts
+MAX_CONCURRENT_STARTS = 4
+START_STAGGER = 0.5
+
+# Hardware H.264 encoders in priority order: encoder -> (input args, output args)
+VAAPI_DEVICE = "/dev/dri/renderD128"
+HW_ENCODERS = {
+    "h264_nvenc": (
+        ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"],
+        ["-preset", "p1", "-tune", "ll"],
+    ),
+    "h264_qsv": (
+        [],
+        ["-preset", "veryfast"],
+    ),
+    "h264_vaapi": (
+        ["-hwaccel", "vaapi", "-vaapi_device", VAAPI_DEVICE],
+        ["-vf", "format=nv12,hwupload"],
+    ),
+    "h264_v4l2m2m": (
+        [],
+        ["-pix_fmt", "yuv420p"],
+    ),
+}
+
+
+def _probe_encoder(encoder: str) -> bool:
+    """Check that an encoder can actually encode a frame on this host"""
+    probe_args = ["-vaapi_device", VAAPI_DEVICE] if encoder == "h264_vaapi" else []
+    _, output_args = HW_ENCODERS[encoder]
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg", "-hide_banner", "-loglevel", "error",
+                *probe_args,
+                "-f", "lavfi", "-i", "color=black:s=256x256:d=0.1",
+                "-frames:v", "1",
+                "-c:v", encoder,
+                *output_args,
+                "-f", "null", "-"
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Read the real duration of a media file with ffprobe"""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                path
+            ],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        return float(result.stdout.strip())
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        logger.warning(f"Could not probe duration of {path}: {e}")
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _detect_hw_encoder() -> str:
+    """Pick the H.264 encoder to use, preferring working hardware encoders"""
+    if settings.video_encoder != "auto":
+        return settings.video_encoder
+        
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        available = result.stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not list FFmpeg encoders: {e}")
+        return "libx264"
+        
+    # An encoder being compiled in does not mean the hardware is present
+    for encoder in HW_ENCODERS:
+        if f" {encoder} " in available and _probe_encoder(encoder):
+            logger.info(f"Using hardware video encoder {encoder}")
+            return encoder
+            
+    logger.info("No hardware video encoder available, using libx264")
+    return "libx264"
+
+
+def _tee_escape(value: str, specials: str) -> str:
+    """Backslash-escape characters the tee muxer's parser treats as separators"""
+    return "".join(f"\\{char}" if char in specials else char for char in value)
+
+
+def _tee_filename(path: Path) -> str:
+    """Escape a tee slave filename, which is unescaped once when slaves are split on '|'"""
+    return _tee_escape(str(path), "\\'|")
+
+
+def _tee_option(value) -> str:
+    """Escape a tee slave option value, which is unescaped again when options are parsed"""
+    return _tee_escape(_tee_escape(str(value), "\\':]"), "\\'|")
+
 
 class FFmpegProcess:
-    def __init__(self, camera_config: CameraConfig):
+    def __init__(
+        self,
+        camera_config: CameraConfig,
+        on_state_change: Optional[Callable[["FFmpegProcess"], None]] = None
+    ):
         self.camera_config = camera_config
-        self.process: Optional[subprocess.Popen] = None
+        self._on_state_change = on_state_change
+        self.process: Optional[asyncio.subprocess.Process] = None
         self.is_running = False
         self.start_time: Optional[datetime] = None
         self.restart_count = 0
+        self.command: List[str] = []
+        self._stderr_tail: deque = deque(maxlen=200)
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._backoff = RESTART_BACKOFF_INITIAL
+        self._last_restart_ts: Optional[float] = None
+        self._restart_times: deque = deque()
+        
+        self._tasks: Set[asyncio.Task] = set()
+        
+        # Paths and the FFmpeg command, which does not change between starts
+        self._camera_path = Path(settings.hls_base_path) / camera_config.camera_id
+        self._tee_outputs = f"{self._build_hls_output()}|{self._build_recording_output()}"
+        self._static_cmd: Optional[Tuple[str, ...]] = None
         
     async def start(self):
         """Start FFmpeg process for the camera"""
@@ -28,34 +181,52 @@ class FFmpegProcess:
             # Create directories
             await self._create_directories()
             
+            # Detect the video encoder once, off the event loop
+            await asyncio.to_thread(_detect_hw_encoder)
+            
             # Build FFmpeg command
             cmd = self._build_ffmpeg_command()
+            self.command = cmd
             
             logger.info(f"Starting FFmpeg for camera {self.camera_config.camera_id}")
             logger.debug(f"FFmpeg command: {' '.join(cmd)}")
             
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                preexec_fn=os.setsid if os.name != 'nt' else None
+            self.process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=os.name != 'nt'
             )
             
             self.is_running = True
             self.start_time = datetime.now()
+            self._notify_state_change()
+            
+            # Drain stderr continuously so FFmpeg never blocks on a full pipe
+            self._stderr_tail = deque(maxlen=200)
+            self._stderr_task = self._spawn(self._drain_stderr(self.process))
+            
+            # Create each hour's recording directory ahead of FFmpeg
+            self._spawn(self._prepare_hour_directories())
             
             # Monitor process in background
-            asyncio.create_task(self._monitor_process())
+            self._spawn(self._monitor_process())
             
         except Exception as e:
             logger.error(f"Failed to start FFmpeg for camera {self.camera_config.camera_id}: {e}")
             self.is_running = False
+            self._notify_state_change()
             
     async def stop(self):
         """Stop FFmpeg process"""
+        # Cancels a pending auto-restart as well as the helper tasks
+        await self._cancel_tasks()
         if not self.is_running or not self.process:
             return
             
+        # Mark as stopped first so the monitor does not treat the exit as a crash
+        self.is_running = False
+        
         try:
             logger.info(f"Stopping FFmpeg for camera {self.camera_config.camera_id}")
             
@@ -66,22 +237,21 @@ class FFmpegProcess:
                 
             # Wait for process to terminate
             try:
-                await asyncio.wait_for(
-                    asyncio.create_task(self._wait_for_process()),
-                    timeout=10.0
-                )
+                await asyncio.wait_for(self.process.wait(), timeout=10.0)
             except asyncio.TimeoutError:
                 logger.warning(f"FFmpeg process for camera {self.camera_config.camera_id} did not terminate gracefully, killing...")
                 if os.name == 'nt':
                     self.process.kill()
                 else:
                     os.killpg(os.getpgid(self.process.pid), signal.SIGKILL)
+                await self.process.wait()
                     
         except Exception as e:
             logger.error(f"Error stopping FFmpeg for camera {self.camera_config.camera_id}: {e}")
         finally:
             self.is_running = False
             self.process = None
+            self._notify_state_change()
             
     async def restart(self):
         """Restart FFmpeg process"""
@@ -90,123 +260,291 @@ class FFmpegProcess:
         await self.start()
         self.restart_count += 1
         
+    def _notify_state_change(self):
+        """Tell the owner that the running state changed"""
+        if self._on_state_change:
+            self._on_state_change(self)
+            
     async def _create_directories(self):
         """Create necessary directories for HLS output"""
-        camera_path = Path(settings.hls_base_path) / self.camera_config.camera_id
-        
         # Create live stream directory
-        live_path = camera_path / "live"
+        live_path = self._camera_path / "live"
         live_path.mkdir(parents=True, exist_ok=True)
         
-        # Create recordings directory structure
-        recordings_path = camera_path / "recordings"
+        # Create the current and next hour's recording directories
+        self._make_hour_directories(datetime.now())
+        
+    def _hour_path(self, hour: datetime) -> Path:
+        """Recording directory for a given hour"""
+        return self._camera_path / "recordings" / hour.strftime("%Y-%m-%d") / f"{hour.hour:02d}"
+        
+    def _make_hour_directories(self, now: datetime):
+        """Create recording directories for the given hour and the one after it"""
+        for hour in (now, now + timedelta(hours=1)):
+            self._hour_path(hour).mkdir(parents=True, exist_ok=True)
+            
+    def _has_segments(self, hour: datetime) -> bool:
+        """Whether FFmpeg has started writing segments for an hour"""
+        try:
+            with os.scandir(self._hour_path(hour)) as entries:
+                return any(entry.name.endswith(".ts") for entry in entries)
+        except FileNotFoundError:
+            return False
+            
+    async def _finalize_hour(self, hour: datetime):
+        """Index a completed hour once FFmpeg has closed its last segment"""
+        deadline = time.monotonic() + HOUR_FINALIZE_TIMEOUT
+        while self.is_running and time.monotonic() < deadline:
+            if await asyncio.to_thread(self._has_segments, hour + timedelta(hours=1)):
+                break
+            await asyncio.sleep(HOUR_FINALIZE_POLL)
+        await asyncio.to_thread(self._write_hour_index, hour)
+        
+    def _write_hour_index(self, hour: datetime):
+        """Write the segment manifest for a completed hour"""
+        hour_path = self._hour_path(hour)
+        if not hour_path.is_dir():
+            return
+            
+        with os.scandir(hour_path) as entries:
+            segments = sorted(
+                (entry.name, entry.stat().st_size)
+                for entry in entries
+                if entry.name.endswith(".ts") and entry.is_file()
+            )
+        if not segments:
+            return
+            
+        # Store real durations; cuts land on keyframes and partial segments follow restarts
+        index = {
+            "segments": [
+                {"name": name, "size": size, "duration": probe_duration(str(hour_path / name))}
+                for name, size in segments
+            ],
+            "total_size": sum(size for _, size in segments)
+        }
         
-        # Create today's recording directory
-        today = datetime.now()
-        date_path = recordings_path / today.strftime("%Y-%m-%d")
-        hour_path = date_path / f"{today.hour:02d}"
-        hour_path.mkdir(parents=True, exist_ok=True)
+        # Write atomically so readers never see a partial manifest
+        tmp_path = hour_path / f"{RECORDING_INDEX_FILE}.tmp"
+        tmp_path.write_text(json.dumps(index))
+        os.replace(tmp_path, hour_path / RECORDING_INDEX_FILE)
         
+    async def _prepare_hour_directories(self):
+        """Keep the next hour's recording directory created before FFmpeg needs it"""
+        while True:
+            now = datetime.now()
+            next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            await asyncio.sleep((next_hour - now).total_seconds())
+            
+            # A failed hour must not stop directories being prepared for the following ones
+            try:
+                await asyncio.to_thread(self._make_hour_directories, next_hour)
+            except Exception as e:
+                logger.error(f"Error creating recording directories for camera {self.camera_config.camera_id}: {e}")
+                
+            try:
+                await self._finalize_hour(next_hour - timedelta(hours=1))
+            except Exception as e:
+                logger.error(f"Error indexing recordings for camera {self.camera_config.camera_id}: {e}")
+            
+    def _spawn(self, coro) -> asyncio.Task:
+        """Start a background task whose lifetime is tied to this process"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+        
+    async def _cancel_tasks(self):
+        """Cancel and wait for this process's background tasks, except the caller"""
+        current = asyncio.current_task()
+        tasks = [task for task in self._tasks if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+            
     def _build_ffmpeg_command(self) -> List[str]:
         """Build FFmpeg command for HLS streaming and recording"""
-        camera_path = Path(settings.hls_base_path) / self.camera_config.camera_id
-        live_path = camera_path / "live"
+        if self._static_cmd is None:
+            self._static_cmd = self._build_static_cmd()
+        return list(self._static_cmd)
+        
+    def _build_hls_output(self) -> str:
+        """Build the tee slave for the live HLS output"""
+        live_path = self._camera_path / "live"
+        return (
+            f"[f=hls"
+            f":hls_time={settings.hls_segment_duration}"
+            f":hls_list_size={settings.hls_list_size}"
+            f":hls_flags=delete_segments+append_list"
+            f":hls_segment_filename={_tee_option(live_path / 'segment%03d.ts')}]"
+            f"{_tee_filename(live_path / 'live.m3u8')}"
+        )
+        
+    def _build_recording_output(self) -> str:
+        """Build the tee slave for minute recordings, bucketed by date and hour"""
+        recordings_path = self._camera_path / "recordings"
+        return (
+            f"[f=segment"
+            f":segment_time={RECORDING_SEGMENT_TIME}"
+            f":segment_atclocktime=1"
+            f":segment_format=mpegts"
+            f":strftime=1]"
+            f"{_tee_filename(recordings_path / '%Y-%m-%d' / '%H' / '%M.ts')}"
+        )
         
-        # Current hour recording path
-        today = datetime.now()
-        recordings_path = camera_path / "recordings" / today.strftime("%Y-%m-%d") / f"{today.hour:02d}"
+    def _build_static_cmd(self) -> Tuple[str, ...]:
+        """Build the full FFmpeg argument list for this camera"""
+        # Video encoder and its encoder-specific flags
+        encoder = _detect_hw_encoder()
+        if encoder in HW_ENCODERS:
+            input_args, encoder_args = HW_ENCODERS[encoder]
+        else:
+            input_args, encoder_args = [], ["-preset", "ultrafast", "-tune", "zerolatency"]
         
-        cmd = [
+        # Encode once and feed both outputs through the tee muxer
+        return (
             "ffmpeg",
+            "-y",  # Overwrite output files
+            "-nostats",  # Progress lines end in \r and would flood the stderr tail
+            "-loglevel", "warning",
+            *input_args,
             "-i", self.camera_config.rtsp_url,
-            "-c:v", "libx264",
+            "-map", "0:v",
+            "-map", "0:a?",
+            "-c:v", encoder,
             "-c:a", "aac",
-            "-preset", "ultrafast",
-            "-tune", "zerolatency",
+            *encoder_args,
             "-threads", str(settings.ffmpeg_thread_count),
             "-b:v", settings.video_bitrate,
             "-b:a", settings.audio_bitrate,
-            "-f", "hls",
-            "-hls_time", str(settings.hls_segment_duration),
-            "-hls_list_size", str(settings.hls_list_size),
-            "-hls_flags", "delete_segments+append_list",
-            "-hls_segment_filename", str(live_path / "segment%03d.ts"),
-            str(live_path / "live.m3u8"),
-            # Recording output
-            "-c:v", "copy",
-            "-c:a", "copy",
-            "-f", "segment",
-            "-segment_time", "60",  # 1-minute segments
-            "-segment_format", "mpegts",
-            "-segment_list", str(recordings_path / "playlist.m3u8"),
-            "-segment_list_flags", "live",
-            "-strftime", "1",
-            str(recordings_path / "%M.ts"),
-            "-y"  # Overwrite output files
-        ]
-        
-        return cmd
+            "-f", "tee",
+            self._tee_outputs
+        )
         
     async def _monitor_process(self):
         """Monitor FFmpeg process and restart if needed"""
-        while self.is_running and self.process:
-            try:
-                # Check if process is still running
-                retcode = self.process.poll()
-                if retcode is not None:
-                    logger.error(f"FFmpeg process for camera {self.camera_config.camera_id} exited with code {retcode}")
-                    
-                    # Read stderr for error details
-                    stderr = self.process.stderr.read().decode('utf-8', errors='ignore')
-                    if stderr:
-                        logger.error(f"FFmpeg stderr: {stderr}")
-                    
-                    self.is_running = False
-                    
-                    # Auto-restart if not too many restarts
-                    if self.restart_count < 5:
-                        logger.info(f"Auto-restarting FFmpeg for camera {self.camera_config.camera_id}")
-                        await asyncio.sleep(5)
-                        await self.restart()
-                    else:
-                        logger.error(f"Too many restarts for camera {self.camera_config.camera_id}, stopping auto-restart")
-                        break
-                        
-                await asyncio.sleep(5)  # Check every 5 seconds
+        process = self.process
+        try:
+            # Wait for the process to exit without polling
+            retcode = await process.wait()
+            
+            # Exit was requested by stop() or a newer process replaced this one
+            if not self.is_running or self.process is not process:
+                return
                 
-            except Exception as e:
-                logger.error(f"Error monitoring FFmpeg process for camera {self.camera_config.camera_id}: {e}")
-                break
+            logger.error(f"FFmpeg process for camera {self.camera_config.camera_id} exited with code {retcode}")
+            
+            # Log the tail of stderr collected by the drain task
+            await asyncio.wait([self._stderr_task], timeout=1.0)
+            stderr = b"".join(self._stderr_tail).decode('utf-8', errors='ignore')
+            if stderr:
+                logger.error(f"FFmpeg stderr: {stderr}")
+            
+            self.is_running = False
+            self._notify_state_change()
+            
+            # A long healthy run since the last restart resets the backoff
+            now = time.monotonic()
+            if self._last_restart_ts is None or now - self._last_restart_ts > RESTART_HEALTHY_PERIOD:
+                self._backoff = RESTART_BACKOFF_INITIAL
+                
+            # Auto-restart, deferred while the restart rate is too high
+            while self._restart_times and now - self._restart_times[0] > RESTART_WINDOW:
+                self._restart_times.popleft()
+                
+            delay = self._backoff + random.uniform(0, self._backoff / 2)
+            if len(self._restart_times) >= MAX_RESTARTS_PER_WINDOW:
+                # Wait for the oldest restart to leave the window instead of giving up
+                delay = max(delay, self._restart_times[0] + RESTART_WINDOW - now)
+                logger.warning(f"Too many restarts for camera {self.camera_config.camera_id}, deferring auto-restart by {delay:.0f}s")
+            else:
+                logger.info(f"Auto-restarting FFmpeg for camera {self.camera_config.camera_id} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            self._backoff = min(self._backoff * 2, RESTART_BACKOFF_MAX)
+            
+            self._last_restart_ts = time.monotonic()
+            self._restart_times.append(self._last_restart_ts)
+            await self.restart()
                 
-    async def _wait_for_process(self):
-        """Wait for process to terminate"""
-        while self.process and self.process.poll() is None:
-            await asyncio.sleep(0.1)
+        except Exception as e:
+            logger.error(f"Error monitoring FFmpeg process for camera {self.camera_config.camera_id}: {e}")
+                
+    async def _drain_stderr(self, process: asyncio.subprocess.Process):
+        """Keep the last lines of FFmpeg stderr without blocking the pipe"""
+        while True:
+            try:
+                line = await process.stderr.readline()
+            except ValueError:
+                # Over-long line was discarded by the stream reader
+                continue
+            if not line:
+                break
+            self._stderr_tail.append(line)
 
 
 class FFmpegManager:
     def __init__(self):
         self.processes: Dict[str, FFmpegProcess] = {}
+        self._start_sem: Optional[asyncio.Semaphore] = None
+        
+        # Camera info for every configured camera, updated on state changes
+        self._status_cache: Dict[str, CameraInfo] = {}
+        for camera_config in camera_configs.values():
+            self._set_status(camera_config, running=False, start_time=None)
+        
+    def _set_status(self, camera_config: CameraConfig, running: bool, start_time: Optional[datetime]):
+        """Store the camera info reported for a camera"""
+        self._status_cache[camera_config.camera_id] = CameraInfo.model_construct(
+            camera_id=camera_config.camera_id,
+            name=camera_config.name,
+            enabled=camera_config.enabled,
+            status="online" if running else "offline",
+            last_activity=start_time
+        )
+        
+    def _on_process_state_change(self, process: FFmpegProcess):
+        """Refresh the cached camera info when a process starts or stops"""
+        # Ignore late notifications from a process that has been replaced
+        if self.processes.get(process.camera_config.camera_id) is process:
+            self._set_status(process.camera_config, process.is_running, process.start_time)
+            
+    async def detect_encoder(self) -> str:
+        """Detect the video encoder off the event loop; later calls reuse the result"""
+        return await asyncio.to_thread(_detect_hw_encoder)
+        
+    def _start_semaphore(self) -> asyncio.Semaphore:
+        """Return the start semaphore, created inside the running event loop"""
+        if self._start_sem is None:
+            self._start_sem = asyncio.Semaphore(MAX_CONCURRENT_STARTS)
+        return self._start_sem
         
     async def start_camera_stream(self, camera_config: CameraConfig):
         """Start streaming for a camera"""
         if camera_config.camera_id in self.processes:
             await self.stop_camera_stream(camera_config.camera_id)
             
-        process = FFmpegProcess(camera_config)
+        process = FFmpegProcess(camera_config, self._on_process_state_change)
         self.processes[camera_config.camera_id] = process
-        await process.start()
+        
+        # Stagger starts so RTSP sessions are not all negotiated at once
+        async with self._start_semaphore():
+            await process.start()
+            await asyncio.sleep(START_STAGGER)
         
     async def stop_camera_stream(self, camera_id: str):
         """Stop streaming for a camera"""
         if camera_id in self.processes:
-            await self.processes[camera_id].stop()
+            process = self.processes[camera_id]
+            await process.stop()
             del self.processes[camera_id]
+            self._set_status(process.camera_config, running=False, start_time=None)
             
     async def restart_camera_stream(self, camera_id: str):
         """Restart streaming for a camera"""
         if camera_id in self.processes:
-            await self.processes[camera_id].restart()
+            async with self._start_semaphore():
+                await self.processes[camera_id].restart()
+                await asyncio.sleep(START_STAGGER)
             
     async def stop_all_streams(self):
         """Stop all camera streams"""
@@ -236,6 +574,24 @@ class FFmpegManager:
             camera_id for camera_id, process in self.processes.items()
             if process.is_running
         ]
+        
+    def pid_to_camera(self) -> Dict[int, str]:
+        """Map the PID of each managed FFmpeg process to its camera"""
+        return {
+            process.process.pid: camera_id for camera_id, process in self.processes.items()
+            if process.process
+        }
+        
+    def list_camera_info(self) -> List[CameraInfo]:
+        """Camera info for all known cameras, as of the last state change"""
+        return list(self._status_cache.values())
+        
+    def count_live_processes(self) -> int:
+        """Count managed FFmpeg processes that have not exited"""
+        return sum(
+            1 for process in self.processes.values()
+            if process.process and process.process.returncode is None
+        )
 
 
 # Global FFmpeg manager instance
@@ -1,62 +1,280 @@
 import psutil
 import asyncio
 import logging
-from typing import Dict, List
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
-from models import HealthMetrics, SystemStatus
+from models import HealthMetrics, SystemStatus, CameraStorage
 from config import settings
 from ffmpeg_manager import ffmpeg_manager
 
 logger = logging.getLogger(__name__)
 
+# FFmpeg PIDs found in the process table: (timestamp, pids)
+PROCESS_CACHE_TTL = 3.0
+_proc_cache: Optional[Tuple[float, List[int]]] = None
+
+# Process objects kept between calls so cpu_percent measures since the last call
+_proc_objects: Dict[int, psutil.Process] = {}
+
+# Exact process names FFmpeg runs under
+_FFMPEG_NAMES = frozenset({"ffmpeg", "ffmpeg.exe"})
+_FFMPEG_COMMS = frozenset(name.encode() for name in _FFMPEG_NAMES)
+
+
+def _scan_ffmpeg_pids_proc() -> List[int]:
+    """Find FFmpeg PIDs by reading /proc/<pid>/comm directly"""
+    pids = []
+    with os.scandir("/proc") as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry.name}/comm", "rb") as f:
+                    if f.read().rstrip(b"\n") in _FFMPEG_COMMS:
+                        pids.append(int(entry.name))
+            except OSError:
+                continue
+    return pids
+
+
+def _scan_ffmpeg_pids_psutil() -> List[int]:
+    """Find FFmpeg PIDs through psutil on platforms without procfs"""
+    return [
+        proc.info['pid'] for proc in psutil.process_iter(['pid', 'name'])
+        if proc.info['name'] in _FFMPEG_NAMES
+    ]
+
+
+def _ffmpeg_pids() -> List[int]:
+    """Return FFmpeg PIDs, walking the process table at most once per TTL"""
+    global _proc_cache
+    now = time.monotonic()
+    if _proc_cache and now - _proc_cache[0] < PROCESS_CACHE_TTL:
+        return _proc_cache[1]
+        
+    if sys.platform.startswith("linux"):
+        pids = _scan_ffmpeg_pids_proc()
+    else:
+        pids = _scan_ffmpeg_pids_psutil()
+    _proc_cache = (now, pids)
+    return pids
+
+
+def _ffmpeg_processes() -> List[psutil.Process]:
+    """Return Process objects for the current FFmpeg PIDs, reusing earlier ones"""
+    processes = []
+    pids = _ffmpeg_pids()
+    for pid in pids:
+        proc = _proc_objects.get(pid)
+        try:
+            # A reused PID belongs to a different process, so start a new object
+            if proc is None or not proc.is_running():
+                proc = psutil.Process(pid)
+                _proc_objects[pid] = proc
+        except psutil.NoSuchProcess:
+            continue
+        processes.append(proc)
+        
+    # Forget processes that are gone
+    for pid in _proc_objects.keys() - set(pids):
+        del _proc_objects[pid]
+    return processes
+
+
+# Mounted partitions rarely change: (timestamp, mountpoints)
+PARTITIONS_CACHE_TTL = 300.0
+_partitions_cache: Optional[Tuple[float, List[str]]] = None
+
+
+def _partitions() -> List[str]:
+    """Return partition mountpoints, re-reading the mount table at most once per TTL"""
+    global _partitions_cache
+    now = time.monotonic()
+    if _partitions_cache and now - _partitions_cache[0] < PARTITIONS_CACHE_TTL:
+        return _partitions_cache[1]
+        
+    mountpoints = [partition.mountpoint for partition in psutil.disk_partitions()]
+    _partitions_cache = (now, mountpoints)
+    return mountpoints
+
+
+def _find_mount(path: str, mountpoints: List[str]) -> Optional[str]:
+    """Return the mountpoint containing a path, if it is a known partition"""
+    path = os.path.normcase(path)
+    best = None
+    for mountpoint in mountpoints:
+        prefix = os.path.normcase(mountpoint).rstrip(os.sep) + os.sep
+        if path == os.path.normcase(mountpoint) or path.startswith(prefix):
+            if best is None or len(mountpoint) > len(best):
+                best = mountpoint
+    return best
+
+
+def _disk_usage(mountpoints: List[str]) -> Dict[str, Dict[str, float]]:
+    """Usage figures for the given mountpoints, skipping any that cannot be read"""
+    disk_usage = {}
+    for mountpoint in sorted(mountpoints):
+        try:
+            partition_usage = psutil.disk_usage(mountpoint)
+            disk_usage[mountpoint] = {
+                "total": partition_usage.total,
+                "used": partition_usage.used,
+                "free": partition_usage.free,
+                "percent": (partition_usage.used / partition_usage.total) * 100
+            }
+        except OSError:
+            continue
+    return disk_usage
+
+
+def _network_stats() -> Dict[str, float]:
+    """System-wide network I/O counters"""
+    network = psutil.net_io_counters()
+    return {
+        "bytes_sent": network.bytes_sent,
+        "bytes_recv": network.bytes_recv,
+        "packets_sent": network.packets_sent,
+        "packets_recv": network.packets_recv
+    }
+
+
+def _sum_files(path: str) -> int:
+    """Total size of the regular files directly inside a directory"""
+    total_size = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                total_size += entry.stat(follow_symlinks=False).st_size
+    return total_size
+
+
+def _sum_tree(path: str) -> int:
+    """Total size of all regular files under a directory"""
+    total_size = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total_size += entry.stat(follow_symlinks=False).st_size
+    return total_size
+
+
+def _collect_storage_details(hls_base_path: str) -> Dict:
+    """Walk the HLS tree and report per-camera storage usage"""
+    storage_info = {
+        "hls_path": str(Path(hls_base_path)),
+        "cameras": {}
+    }
+    
+    if os.path.isdir(hls_base_path):
+        total_size = 0
+        
+        with os.scandir(hls_base_path) as entries:
+            camera_dirs = [entry for entry in entries if entry.is_dir()]
+            
+        for camera_dir in camera_dirs:
+            # Calculate live stream size
+            live_path = os.path.join(camera_dir.path, "live")
+            live_size = _sum_files(live_path) if os.path.isdir(live_path) else 0
+            
+            # Calculate recordings size
+            recordings_path = os.path.join(camera_dir.path, "recordings")
+            recordings_size = _sum_tree(recordings_path) if os.path.isdir(recordings_path) else 0
+            
+            camera_size = live_size + recordings_size
+            # MB figures are derived by the model when the response is serialized
+            storage_info["cameras"][camera_dir.name] = CameraStorage.model_construct(
+                total_size=camera_size,
+                live_size=live_size,
+                recordings_size=recordings_size
+            )
+            
+            total_size += camera_size
+            
+        storage_info["total_size"] = total_size
+        storage_info["total_size_mb"] = round(total_size / 1024 / 1024, 2)
+        storage_info["total_size_gb"] = round(total_size / 1024 / 1024 / 1024, 2)
+        
+    return storage_info
+
 
 class HealthMonitor:
     def __init__(self):
         self.last_metrics: HealthMetrics = None
         self.alerts: List[str] = []
+        self.cpu_task: Optional[asyncio.Task] = None
+        self._cached: Optional[Tuple[float, HealthMetrics]] = None
+        self._ttl = settings.metrics_ttl
+        self._hls_mount_path = str(Path(settings.hls_base_path).resolve())
+        
+        # Prime psutil's CPU counters so the first non-blocking reading is meaningful
+        self._cpu_usage = psutil.cpu_percent(interval=None)
+        
+    async def start_cpu_sampler(self):
+        """Start sampling CPU usage in the background"""
+        if self.cpu_task and not self.cpu_task.done():
+            return
+            
+        self.cpu_task = asyncio.create_task(self._sample_cpu())
+        logger.info("CPU sampler started")
+        
+    async def stop_cpu_sampler(self):
+        """Stop the background CPU sampler"""
+        if self.cpu_task:
+            self.cpu_task.cancel()
+            await asyncio.gather(self.cpu_task, return_exceptions=True)
+            self.cpu_task = None
+        logger.info("CPU sampler stopped")
+        
+    async def _sample_cpu(self):
+        """Refresh CPU usage every second; the only caller of cpu_percent while running"""
+        while True:
+            self._cpu_usage = psutil.cpu_percent(interval=None)
+            await asyncio.sleep(1.0)
+            
+    def _hls_mount(self) -> str:
+        """Return the disk_usage key for the partition holding the HLS storage"""
+        return _find_mount(self._hls_mount_path, _partitions()) or self._hls_mount_path
         
     async def get_system_metrics(self) -> HealthMetrics:
-        """Collect current system metrics"""
+        """Collect current system metrics, reusing a recent collection"""
+        if self._cached and time.monotonic() - self._cached[0] < self._ttl:
+            return self._cached[1]
+            
         try:
-            # CPU usage
-            cpu_usage = psutil.cpu_percent(interval=1)
+            # Disk usage for the partitions holding the HLS storage and the root filesystem
+            mountpoints = _partitions()
+            watched_mounts = {
+                self._hls_mount(),
+                _find_mount(os.path.abspath(os.sep), mountpoints) or os.path.abspath(os.sep)
+            }
             
-            # Memory usage
-            memory = psutil.virtual_memory()
+            # The collectors are independent blocking calls, so run them side by side
+            memory, disk_usage, network_stats = await asyncio.gather(
+                asyncio.to_thread(psutil.virtual_memory),
+                asyncio.to_thread(_disk_usage, list(watched_mounts)),
+                asyncio.to_thread(_network_stats)
+            )
             memory_usage = memory.percent
             
-            # Disk usage
-            disk_usage = {}
-            for partition in psutil.disk_partitions():
-                try:
-                    partition_usage = psutil.disk_usage(partition.mountpoint)
-                    disk_usage[partition.mountpoint] = {
-                        "total": partition_usage.total,
-                        "used": partition_usage.used,
-                        "free": partition_usage.free,
-                        "percent": (partition_usage.used / partition_usage.total) * 100
-                    }
-                except PermissionError:
-                    continue
-            
-            # Network statistics
-            network = psutil.net_io_counters()
-            network_stats = {
-                "bytes_sent": network.bytes_sent,
-                "bytes_recv": network.bytes_recv,
-                "packets_sent": network.packets_sent,
-                "packets_recv": network.packets_recv
-            }
+            # CPU usage over the last sampling interval, without blocking
+            if self.cpu_task:
+                cpu_usage = self._cpu_usage
+            else:
+                cpu_usage = psutil.cpu_percent(interval=None)
             
             # Active streams and FFmpeg processes
             active_streams = len(ffmpeg_manager.list_active_processes())
-            ffmpeg_processes = len([
-                p for p in psutil.process_iter(['name'])
-                if p.info['name'] and 'ffmpeg' in p.info['name'].lower()
-            ])
+            ffmpeg_processes = ffmpeg_manager.count_live_processes()
             
-            metrics = HealthMetrics(
+            metrics = HealthMetrics.model_construct(
                 timestamp=datetime.now(),
                 cpu_usage=cpu_usage,
                 memory_usage=memory_usage,
@@ -67,6 +285,7 @@ class HealthMonitor:
             )
             
             self.last_metrics = metrics
+            self._cached = (time.monotonic(), metrics)
             return metrics
             
         except Exception as e:
@@ -77,53 +296,44 @@ class HealthMonitor:
         """Check system health and generate alerts"""
         metrics = await self.get_system_metrics()
         alerts = []
-        status = "healthy"
+        warning = False
+        critical = False
         
         # Check CPU usage
         if metrics.cpu_usage > settings.cpu_threshold:
             alerts.append(f"High CPU usage: {metrics.cpu_usage:.1f}%")
-            status = "warning" if status == "healthy" else status
+            warning = True
             
         # Check memory usage
         if metrics.memory_usage > settings.memory_threshold:
             alerts.append(f"High memory usage: {metrics.memory_usage:.1f}%")
-            status = "warning" if status == "healthy" else status
+            warning = True
             
         # Check disk usage
         for mountpoint, usage in metrics.disk_usage.items():
-            if usage["percent"] > settings.disk_threshold:
-                alerts.append(f"High disk usage on {mountpoint}: {usage['percent']:.1f}%")
-                if usage["percent"] > 95:
-                    status = "critical"
-                elif status == "healthy":
-                    status = "warning"
-        
-        # Check HLS storage specifically
-        try:
-            hls_path = Path(settings.hls_base_path)
-            if hls_path.exists():
-                hls_usage = psutil.disk_usage(str(hls_path))
-                hls_percent = (hls_usage.used / hls_usage.total) * 100
-                if hls_percent > settings.disk_threshold:
-                    alerts.append(f"High HLS storage usage: {hls_percent:.1f}%")
-        except Exception:
-            pass
-            
-        # Check FFmpeg processes
-        if metrics.ffmpeg_processes != metrics.active_streams:
-            alerts.append(f"FFmpeg process mismatch: {metrics.ffmpeg_processes} processes for {metrics.active_streams} streams")
-            status = "warning" if status == "healthy" else status
+            percent = usage["percent"]
+            if percent <= settings.disk_threshold:
+                continue
+            alerts.append(f"High disk usage on {mountpoint}: {percent:.1f}%")
+            warning = True
+            if percent > 95:
+                critical = True
+        
+        # Check HLS storage specifically, reusing the partition collected above
+        hls_usage = metrics.disk_usage.get(self._hls_mount())
+        if hls_usage and hls_usage["percent"] > settings.disk_threshold:
+            alerts.append(f"High HLS storage usage: {hls_usage['percent']:.1f}%")
             
         # Check for dead processes
-        dead_cameras = []
-        for camera_id in ffmpeg_manager.processes:
-            process_status = ffmpeg_manager.get_process_status(camera_id)
-            if process_status["status"] == "stopped":
-                dead_cameras.append(camera_id)
-                
+        dead_cameras = [
+            camera_id for camera_id, process in ffmpeg_manager.processes.items()
+            if not process.is_running
+        ]
         if dead_cameras:
             alerts.append(f"Inactive cameras: {', '.join(dead_cameras)}")
-            status = "warning" if status == "healthy" else status
+            warning = True
+        
+        status = "critical" if critical else "warning" if warning else "healthy"
         
         # Determine overall message
         if status == "healthy":
@@ -135,7 +345,7 @@ class HealthMonitor:
             
         self.alerts = alerts
         
-        return SystemStatus(
+        return SystemStatus.model_construct(
             status=status,
             message=message,
             metrics=metrics,
@@ -145,28 +355,36 @@ class HealthMonitor:
     async def get_detailed_process_info(self) -> Dict:
         """Get detailed information about running processes"""
         processes = []
+        pid_to_camera = ffmpeg_manager.pid_to_camera()
         
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'cmdline']):
+        for proc in _ffmpeg_processes():
+            # Managed processes are identified by PID, so their command line need not be read
+            camera_id = pid_to_camera.get(proc.pid)
+            attrs = ['pid', 'name', 'cpu_percent', 'memory_percent']
+            if camera_id is None:
+                attrs.append('cmdline')
+                
             try:
-                if proc.info['name'] and 'ffmpeg' in proc.info['name'].lower():
-                    # Extract camera ID from command line if possible
-                    camera_id = "unknown"
-                    cmdline = proc.info.get('cmdline', [])
-                    for i, arg in enumerate(cmdline):
-                        if 'camera_' in arg or 'cam_' in arg:
-                            camera_id = arg.split('/')[-2] if '/' in arg else arg
-                            break
-                    
-                    processes.append({
-                        "pid": proc.info['pid'],
-                        "camera_id": camera_id,
-                        "cpu_percent": proc.info['cpu_percent'],
-                        "memory_percent": proc.info['memory_percent'],
-                        "cmdline": ' '.join(cmdline[:5]) + "..." if len(cmdline) > 5 else ' '.join(cmdline)
-                    })
+                # Read the remaining attributes in a single batch
+                with proc.oneshot():
+                    info = proc.as_dict(attrs=attrs)
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
                 
+            if camera_id is None:
+                camera_id = "unknown"
+                cmdline = info.get('cmdline') or []
+            else:
+                cmdline = ffmpeg_manager.processes[camera_id].command
+            
+            processes.append({
+                "pid": info['pid'],
+                "camera_id": camera_id,
+                "cpu_percent": info['cpu_percent'],
+                "memory_percent": info['memory_percent'],
+                "cmdline": ' '.join(cmdline[:5]) + "..." if len(cmdline) > 5 else ' '.join(cmdline)
+            })
+            
         return {
             "ffmpeg_processes": processes,
             "total_count": len(processes),
@@ -176,55 +394,7 @@ class HealthMonitor:
     async def get_storage_details(self) -> Dict:
         """Get detailed storage information"""
         try:
-            hls_path = Path(settings.hls_base_path)
-            storage_info = {
-                "hls_path": str(hls_path),
-                "cameras": {}
-            }
-            
-            if hls_path.exists():
-                total_size = 0
-                
-                for camera_dir in hls_path.iterdir():
-                    if camera_dir.is_dir():
-                        camera_size = 0
-                        live_size = 0
-                        recordings_size = 0
-                        
-                        # Calculate live stream size
-                        live_path = camera_dir / "live"
-                        if live_path.exists():
-                            for file in live_path.glob("*"):
-                                if file.is_file():
-                                    size = file.stat().st_size
-                                    live_size += size
-                                    camera_size += size
-                        
-                        # Calculate recordings size
-                        recordings_path = camera_dir / "recordings"
-                        if recordings_path.exists():
-                            for file in recordings_path.rglob("*"):
-                                if file.is_file():
-                                    size = file.stat().st_size
-                                    recordings_size += size
-                                    camera_size += size
-                        
-                        storage_info["cameras"][camera_dir.name] = {
-                            "total_size": camera_size,
-                            "live_size": live_size,
-                            "recordings_size": recordings_size,
-                            "live_size_mb": round(live_size / 1024 / 1024, 2),
-                            "recordings_size_mb": round(recordings_size / 1024 / 1024, 2),
-                            "total_size_mb": round(camera_size / 1024 / 1024, 2)
-                        }
-                        
-                        total_size += camera_size
-                
-                storage_info["total_size"] = total_size
-                storage_info["total_size_mb"] = round(total_size / 1024 / 1024, 2)
-                storage_info["total_size_gb"] = round(total_size / 1024 / 1024 / 1024, 2)
-            
-            return storage_info
+            return await asyncio.to_thread(_collect_storage_details, settings.hls_base_path)
             
         except Exception as e:
             logger.error(f"Error getting storage details: {e}")
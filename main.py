@@ -1,20 +1,27 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, StreamingResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import asyncio
+import json
+import math
+import os
+import stat
+import time
+import aiofiles.os
 from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime
-from typing import List, Dict
+from datetime import datetime, timedelta
+from typing import List, Dict, Tuple
 
 from config import settings, camera_configs
 from models import (
     CameraInfo, StreamInfo, HealthMetrics, SystemStatus, 
     APIResponse, ErrorResponse, RecordingInfo
 )
-from ffmpeg_manager import ffmpeg_manager
+from ffmpeg_manager import (
+    ffmpeg_manager, probe_duration, RECORDING_INDEX_FILE, RECORDING_SEGMENT_TIME
+)
 from health_monitor import health_monitor
 from cleanup_manager import cleanup_manager
 
@@ -37,11 +44,19 @@ async def lifespan(app: FastAPI):
     # Start cleanup scheduler
     await cleanup_manager.start_cleanup_scheduler()
     
-    # Start camera streams
+    # Start CPU sampling for health metrics
+    await health_monitor.start_cpu_sampler()
+    
+    # Detect the video encoder once, before concurrent starts would each probe it
+    await ffmpeg_manager.detect_encoder()
+    
+    # Start camera streams (the manager staggers concurrent starts)
+    start_tasks = []
     for camera_config in camera_configs.values():
         if camera_config.enabled:
             logger.info(f"Starting stream for camera {camera_config.camera_id}")
-            await ffmpeg_manager.start_camera_stream(camera_config)
+            start_tasks.append(ffmpeg_manager.start_camera_stream(camera_config))
+    await asyncio.gather(*start_tasks)
     
     logger.info("CCTV Streaming API started successfully!")
     yield
@@ -49,9 +64,115 @@ async def lifespan(app: FastAPI):
     # Cleanup on shutdown
     logger.info("Shutting down CCTV Streaming API...")
     await cleanup_manager.stop_cleanup_scheduler()
+    await health_monitor.stop_cpu_sampler()
     await ffmpeg_manager.stop_all_streams()
     logger.info("CCTV Streaming API shutdown complete.")
 
+def _build_recording_playlist(base_url: str, segments: List[Tuple[str, float]], complete: bool) -> str:
+    """Build an HLS playlist for one hour of recording segments and their durations"""
+    target_duration = math.ceil(max(duration for _, duration in segments))
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{target_duration}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:" + ("VOD" if complete else "EVENT"),
+    ]
+    for segment, duration in segments:
+        lines.append(f"#EXTINF:{duration:.3f},")
+        lines.append(f"{base_url}/{segment}")
+    if complete:
+        lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+def _scan_recordings(camera_id: str) -> List[RecordingInfo]:
+    """Collect recording info for a camera from its recordings directory"""
+    recordings_path = Path(settings.hls_base_path) / camera_id / "recordings"
+    
+    if not recordings_path.exists():
+        return []
+    
+    recordings = []
+    for date_dir in sorted(recordings_path.iterdir(), reverse=True):
+        if date_dir.is_dir():
+            for hour_dir in sorted(date_dir.iterdir(), reverse=True):
+                if hour_dir.is_dir():
+                    index_path = hour_dir / RECORDING_INDEX_FILE
+                    if index_path.exists():
+                        # Completed hour: read the manifest written by the FFmpeg manager
+                        index = json.loads(index_path.read_text())
+                        segments = [segment["name"] for segment in index["segments"]]
+                        total_size = index["total_size"]
+                    else:
+                        # Current (or unindexed) hour: scan the segments directly
+                        segments, total_size = [], 0
+                        with os.scandir(hour_dir) as entries:
+                            for entry in entries:
+                                if entry.name.endswith(".ts") and entry.is_file():
+                                    segments.append(entry.name)
+                                    total_size += entry.stat().st_size
+                        segments.sort()
+                    
+                    if segments:
+                        recordings.append(RecordingInfo.model_construct(
+                            camera_id=camera_id,
+                            date=date_dir.name,
+                            hour=int(hour_dir.name),
+                            segments=segments,
+                            playlist_url=f"/recordings/{camera_id}/{date_dir.name}/{hour_dir.name}/playlist.m3u8",
+                            total_size=total_size
+                        ))
+    
+    return recordings
+
+# Recent playlist existence lookups: path -> (timestamp, exists)
+PLAYLIST_EXISTS_TTL = 1.0
+_playlist_exists_cache: Dict[str, Tuple[float, bool]] = {}
+
+async def _playlist_exists(path: str) -> bool:
+    """Check whether a playlist exists, reusing lookups made within the TTL"""
+    now = time.monotonic()
+    cached = _playlist_exists_cache.get(path)
+    if cached and now - cached[0] < PLAYLIST_EXISTS_TTL:
+        return cached[1]
+    
+    exists = await aiofiles.os.path.exists(path)
+    _playlist_exists_cache[path] = (now, exists)
+    return exists
+
+# Probed durations for hours without a complete manifest: hour_dir -> {segment: duration}
+_segment_durations: Dict[str, Dict[str, float]] = {}
+
+def _segment_duration(hour_dir: Path, name: str) -> float:
+    """Duration of a closed segment, probed once"""
+    durations = _segment_durations.setdefault(str(hour_dir), {})
+    if name not in durations:
+        duration = probe_duration(str(hour_dir / name))
+        durations[name] = duration if duration else float(RECORDING_SEGMENT_TIME)
+    return durations[name]
+
+def _recording_segments(hour_dir: Path, ended: bool) -> Tuple[List[Tuple[str, float]], bool]:
+    """Closed segments of a recording hour with their durations, and whether the hour is final"""
+    index_path = hour_dir / RECORDING_INDEX_FILE
+    if index_path.exists():
+        # Finalized hour: the manifest holds every segment and its duration
+        index = json.loads(index_path.read_text())
+        segments = [
+            (segment["name"], segment.get("duration") or _segment_duration(hour_dir, segment["name"]))
+            for segment in index["segments"]
+        ]
+        if all(segment.get("duration") for segment in index["segments"]):
+            _segment_durations.pop(str(hour_dir), None)
+        return segments, True
+        
+    if not hour_dir.is_dir():
+        return [], ended
+    names = sorted(f.name for f in hour_dir.glob("*.ts"))
+    if not ended:
+        # FFmpeg may still be writing the newest segment
+        names = names[:-1]
+    return [(name, _segment_duration(hour_dir, name)) for name in names], ended
+
 # Create FastAPI app
 app = FastAPI(
     title="CCTV Streaming API",
@@ -69,8 +190,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files for HLS segments
-app.mount("/hls", StaticFiles(directory=settings.hls_base_path), name="hls")
+# HLS segments and playlists
+_HLS_ROOT = Path(settings.hls_base_path).resolve()
+_HLS_FILE_TYPES = {
+    ".ts": ("video/mp2t", "public, max-age=2"),
+    ".m3u8": ("application/vnd.apple.mpegurl", "no-cache"),
+}
+
+@app.api_route("/hls/{path:path}", methods=["GET", "HEAD"])
+async def get_hls_file(path: str, request: Request):
+    """Serve an HLS segment or playlist from the HLS directory"""
+    full_path = (_HLS_ROOT / path).resolve()
+    file_type = _HLS_FILE_TYPES.get(full_path.suffix)
+    if file_type is None or not full_path.is_relative_to(_HLS_ROOT):
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    try:
+        stat_result = os.stat(full_path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    media_type, cache_control = file_type
+    return FileResponse(
+        full_path,
+        media_type=media_type,
+        headers={"Cache-Control": cache_control},
+        stat_result=stat_result,
+        method=request.method
+    )
 
 # Root endpoint
 @app.get("/")
@@ -126,28 +275,18 @@ async def get_storage_info():
 @app.get("/cameras", response_model=List[CameraInfo])
 async def list_cameras():
     """List all configured cameras"""
-    cameras = []
-    for camera_id, config in camera_configs.items():
-        status = ffmpeg_manager.get_process_status(camera_id)
-        cameras.append(CameraInfo(
-            camera_id=camera_id,
-            name=config.name,
-            enabled=config.enabled,
-            status="online" if status["status"] == "running" else "offline",
-            last_activity=status.get("start_time")
-        ))
-    return cameras
+    return ffmpeg_manager.list_camera_info()
 
 @app.get("/cameras/{camera_id}", response_model=CameraInfo)
 async def get_camera_info(camera_id: str):
     """Get information about a specific camera"""
-    if camera_id not in camera_configs:
+    config = camera_configs.get(camera_id)
+    if config is None:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    config = camera_configs[camera_id]
     status = ffmpeg_manager.get_process_status(camera_id)
     
-    return CameraInfo(
+    return CameraInfo.model_construct(
         camera_id=camera_id,
         name=config.name,
         enabled=config.enabled,
@@ -164,7 +303,7 @@ async def get_live_stream(camera_id: str):
     
     playlist_path = Path(settings.hls_base_path) / camera_id / "live" / "live.m3u8"
     
-    if not playlist_path.exists():
+    if not await _playlist_exists(str(playlist_path)):
         raise HTTPException(status_code=404, detail="Live stream not available")
     
     return FileResponse(
@@ -176,13 +315,13 @@ async def get_live_stream(camera_id: str):
 @app.get("/stream/{camera_id}/info", response_model=StreamInfo)
 async def get_stream_info(camera_id: str):
     """Get streaming information for a camera"""
-    if camera_id not in camera_configs:
+    config = camera_configs.get(camera_id)
+    if config is None:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    config = camera_configs[camera_id]
     status = ffmpeg_manager.get_process_status(camera_id)
     
-    return StreamInfo(
+    return StreamInfo.model_construct(
         camera_id=camera_id,
         stream_url=f"/stream/{camera_id}/live.m3u8",
         playlist_url=f"/hls/{camera_id}/live/live.m3u8",
@@ -195,11 +334,11 @@ async def get_stream_info(camera_id: str):
 @app.post("/cameras/{camera_id}/start")
 async def start_camera_stream(camera_id: str):
     """Start streaming for a camera"""
-    if camera_id not in camera_configs:
+    config = camera_configs.get(camera_id)
+    if config is None:
         raise HTTPException(status_code=404, detail="Camera not found")
     
     try:
-        config = camera_configs[camera_id]
         await ffmpeg_manager.start_camera_stream(config)
         return APIResponse(
             success=True,
@@ -248,31 +387,7 @@ async def list_recordings(camera_id: str):
     if camera_id not in camera_configs:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    recordings_path = Path(settings.hls_base_path) / camera_id / "recordings"
-    
-    if not recordings_path.exists():
-        return []
-    
-    recordings = []
-    for date_dir in sorted(recordings_path.iterdir(), reverse=True):
-        if date_dir.is_dir():
-            for hour_dir in sorted(date_dir.iterdir(), reverse=True):
-                if hour_dir.is_dir():
-                    segments = [f.name for f in hour_dir.glob("*.ts")]
-                    playlist_path = hour_dir / "playlist.m3u8"
-                    
-                    if segments and playlist_path.exists():
-                        total_size = sum(f.stat().st_size for f in hour_dir.glob("*.ts"))
-                        recordings.append(RecordingInfo(
-                            camera_id=camera_id,
-                            date=date_dir.name,
-                            hour=int(hour_dir.name),
-                            segments=segments,
-                            playlist_url=f"/hls/{camera_id}/recordings/{date_dir.name}/{hour_dir.name}/playlist.m3u8",
-                            total_size=total_size
-                        ))
-    
-    return recordings
+    return await asyncio.to_thread(_scan_recordings, camera_id)
 
 @app.get("/recordings/{camera_id}/{date}/{hour}/playlist.m3u8")
 async def get_recording_playlist(camera_id: str, date: str, hour: str):
@@ -280,14 +395,22 @@ async def get_recording_playlist(camera_id: str, date: str, hour: str):
     if camera_id not in camera_configs:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    playlist_path = Path(settings.hls_base_path) / camera_id / "recordings" / date / hour / "playlist.m3u8"
+    hour_dir = Path(settings.hls_base_path) / camera_id / "recordings" / date / hour
+    
+    # Without a manifest, only hours before the previous one are certain to be closed
+    ended = f"{date}/{hour}" < (datetime.now() - timedelta(hours=1)).strftime("%Y-%m-%d/%H")
     
-    if not playlist_path.exists():
+    # FFmpeg buckets segments by hour itself, so the playlist is built from the directory
+    segments, complete = await asyncio.to_thread(_recording_segments, hour_dir, ended)
+    if not segments:
         raise HTTPException(status_code=404, detail="Recording not found")
     
-    return FileResponse(
-        playlist_path,
-        media_type="application/vnd.apple.mpegurl"
+    return Response(
+        content=_build_recording_playlist(
+            f"/hls/{camera_id}/recordings/{date}/{hour}", segments, complete
+        ),
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "no-cache"} if not complete else None
     )
 
 # Cleanup endpoints
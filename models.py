@@ -1,5 +1,5 @@
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field
 from datetime import datetime
 
 
@@ -46,15 +46,36 @@ class RecordingInfo(BaseModel):
     total_size: int  # in bytes
 
 
+class CameraStorage(BaseModel):
+    total_size: int  # in bytes
+    live_size: int
+    recordings_size: int
+    
+    @computed_field
+    @property
+    def live_size_mb(self) -> float:
+        return round(self.live_size / 1024 / 1024, 2)
+        
+    @computed_field
+    @property
+    def recordings_size_mb(self) -> float:
+        return round(self.recordings_size / 1024 / 1024, 2)
+        
+    @computed_field
+    @property
+    def total_size_mb(self) -> float:
+        return round(self.total_size / 1024 / 1024, 2)
+
+
 class APIResponse(BaseModel):
     success: bool
     message: str
     data: Optional[Any] = None
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = Field(default_factory=datetime.now)
 
 
 class ErrorResponse(BaseModel):
     success: bool = False
     error: str
     details: Optional[str] = None
-    timestamp: datetime = datetime.now() 
\ No newline at end of file
+    timestamp: datetime = Field(default_factory=datetime.now) 
\ No newline at end of file
@@ -14,8 +14,8 @@ def check_python_version():
     """Check Python version"""
     print("Checking Python version...")
     version = sys.version_info
-    if version.major < 3 or (version.major == 3 and version.minor < 8):
-        print(f"❌ Python 3.8+ required, got {version.major}.{version.minor}")
+    if version.major < 3 or (version.major == 3 and version.minor < 9):
+        print(f"❌ Python 3.9+ required, got {version.major}.{version.minor}")
         return False
     print(f"✅ Python {version.major}.{version.minor}.{version.micro}")
     return True